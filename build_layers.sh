@@ -8,9 +8,7 @@ mkdir -p layers/utility_layer/python
 # Create requirements.txt files for layers
 cat > layers/snowflake_layer/python/requirements.txt << EOF
 # Using specific versions known to work with Lambda
-snowflake-sqlalchemy
 snowflake-connector-python
-SQLAlchemy
 # Pinning cryptography to a version that works well in Lambda
 cryptography
 # Note: we're not using the latest version to avoid Rust compilation issues
@@ -19,6 +17,7 @@ EOF
 cat > layers/utility_layer/python/requirements.txt << EOF
 requests
 boto3
+orjson
 EOF
 
 # Build snowflake layer using Docker
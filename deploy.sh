@@ -80,8 +80,11 @@ sam deploy \
   "SnowflakeDatabase=${SNOWFLAKE_DATABASE:-DEV}" \
   "SnowflakeSchema=${SNOWFLAKE_SCHEMA:-BRONZE}" \
   "SnowflakeRole=${SNOWFLAKE_ROLE:-AIRFLOW_ROLE}" \
+  "SnowflakeCopyThreshold=${SNOWFLAKE_COPY_THRESHOLD:-500}" \
   "AirflowEndpoint=${AIRFLOW_ENDPOINT:-http://52.205.187.101:8080}" \
-  "AirflowUsername=${AIRFLOW_USERNAME:-admin}"
+  "AirflowUsername=${AIRFLOW_USERNAME:-admin}" \
+  "LambdaMemorySize=${LAMBDA_MEMORY_SIZE:-1769}" \
+  "ProvisionedConcurrency=${PROVISIONED_CONCURRENCY:-0}"
 
 echo "Retrieving API Gateway URL..."
 API_URL=$(aws cloudformation describe-stacks --stack-name $STACK_NAME --query "Stacks[0].Outputs[?OutputKey=='ApiUrl'].OutputValue" --output text)
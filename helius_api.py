@@ -5,6 +5,9 @@ import logging
 import requests
 from db_helpers import fetch_addresses_from_db
 
+# Shared session so consecutive Helius API calls reuse one TLS connection
+session = requests.Session()
+
 def get_existing_webhooks():
     """
     Retrieves all existing webhooks using the Helius API.
@@ -16,7 +19,7 @@ def get_existing_webhooks():
         return []
     url = f"https://api.helius.xyz/v0/webhooks?api-key={api_key}"
     try:
-        response = requests.get(url)
+        response = session.get(url)
         if response.status_code == 200:
             webhooks = response.json()
             logging.info("Retrieved existing webhooks: %s", webhooks)
@@ -55,7 +58,7 @@ def create_webhook(new_url, addresses):
     }
     headers = {"Content-Type": "application/json"}
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        response = session.post(url, headers=headers, data=json.dumps(payload))
         if response.status_code == 200:
             logging.info("Successfully created webhook.")
             return response.json()
@@ -92,7 +95,7 @@ def update_webhook(webhook_id, new_url, addresses):
     }
     headers = {"Content-Type": "application/json"}
     try:
-        response = requests.put(url, headers=headers, data=json.dumps(payload))
+        response = session.put(url, headers=headers, data=json.dumps(payload))
         if response.status_code == 200:
             logging.info("Successfully updated webhook.")
             return response.json()
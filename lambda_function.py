@@ -1,88 +1,329 @@
 import sys
-import traceback
-import json
+import orjson
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import os
 import uuid
 import logging
-import datetime
-import requests
-from requests.auth import HTTPBasicAuth
-from sqlalchemy import create_engine, text
-from urllib.parse import quote_plus
+import operator
+import time
+import base64
+import concurrent.futures
+import threading
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Global variable to track the time of the last DAG trigger.
+# Configuration is read once per container rather than on every invocation
+SNOWFLAKE_ACCOUNT = os.environ.get('SNOWFLAKE_ACCOUNT')
+SNOWFLAKE_USER = os.environ.get('SNOWFLAKE_USER')
+SNOWFLAKE_PASSWORD = os.environ.get('SNOWFLAKE_PASSWORD')
+SNOWFLAKE_WAREHOUSE = os.environ.get('SNOWFLAKE_WAREHOUSE', 'DEV_WH')
+SNOWFLAKE_DATABASE = os.environ.get('SNOWFLAKE_DATABASE', 'DEV')
+SNOWFLAKE_SCHEMA = os.environ.get('SNOWFLAKE_SCHEMA', 'BRONZE')
+SNOWFLAKE_ROLE = os.environ.get('SNOWFLAKE_ROLE', 'AIRFLOW_ROLE')
+AIRFLOW_ENDPOINT = os.environ.get('AIRFLOW_ENDPOINT', 'http://52.205.187.101:8080')
+AIRFLOW_USERNAME = os.environ.get('AIRFLOW_USERNAME', 'admin')
+AIRFLOW_PASSWORD = os.environ.get('AIRFLOW_PASSWORD', 'password')
+WEBHOOK_QUEUE_URL = os.environ.get('WEBHOOK_QUEUE_URL')
+DAG_TRIGGER_LOCK_TABLE = os.environ.get('DAG_TRIGGER_LOCK_TABLE')
+
+# SQS rejects message bodies larger than 256 KiB
+SQS_MAX_MESSAGE_BYTES = 256 * 1024
+
+# Keyword arguments for snowflake.connector.connect; credentials are passed as-is,
+# so passwords containing URL-reserved characters need no escaping
+_SNOWFLAKE_CONNECT_ARGS = {
+    'user': SNOWFLAKE_USER,
+    'password': SNOWFLAKE_PASSWORD,
+    'account': SNOWFLAKE_ACCOUNT,
+    'warehouse': SNOWFLAKE_WAREHOUSE,
+    'database': SNOWFLAKE_DATABASE,
+    'schema': SNOWFLAKE_SCHEMA,
+    'role': SNOWFLAKE_ROLE,
+    'client_session_keep_alive': True,
+    # Server-side binding: the VALUES insert binds every row's parameters in one statement
+    'paramstyle': 'qmark',
+    # Each load statement commits on its own, so one failed batch cannot undo earlier ones
+    'autocommit': True,
+    # Bounds only the login, so an unreachable account fails fast. No network_timeout:
+    # it would also cap the INSERT, PUT and COPY statements and warehouse auto-resume.
+    'login_timeout': 10,
+}
+
+# Statements are built once per container. Placeholders use the qmark paramstyle
+# set in _SNOWFLAKE_CONNECT_ARGS, so parameters are bound server-side.
+_SWAP_COLUMNS = """USER_ADDRESS, SWAPFROMTOKEN, SWAPFROMAMOUNT,
+        SWAPTOTOKEN, SWAPTOAMOUNT, SIGNATURE,
+        SOURCE, TIMESTAMP"""
+# Signatures already in HELIUS_SWAPS are filtered out server-side, in the same statement
+# that inserts the new rows; {rows} is one _VALUES_ROW per record. Snowflake enforces no
+# unique constraint, so two containers loading the same signature at the same moment
+# can still both insert it: this narrows the duplicate window, it does not close it.
+_INSERT_SQL = f"""
+    INSERT INTO HELIUS_SWAPS ({_SWAP_COLUMNS})
+    SELECT {_SWAP_COLUMNS}
+    FROM (VALUES {{rows}}) AS src ({_SWAP_COLUMNS})
+    WHERE NOT EXISTS (SELECT 1 FROM HELIUS_SWAPS t WHERE t.SIGNATURE = src.SIGNATURE)
+"""
+_VALUES_ROW = "(?, ?, ?, ?, ?, ?, ?, ?)"
+# Snowflake rejects VALUES lists longer than this, whatever COPY_THRESHOLD is set to
+MAX_VALUES_ROWS = 16384
+# Large batches are bulk-loaded into a session-scoped table first, then merged the same way
+_CREATE_LOAD_TABLE_SQL = "CREATE OR REPLACE TEMPORARY TABLE HELIUS_SWAPS_LOAD LIKE HELIUS_SWAPS"
+_PUT_SQL = "PUT file://{local_path} @%HELIUS_SWAPS/webhook/ AUTO_COMPRESS=FALSE SOURCE_COMPRESSION=GZIP"
+_COPY_SQL = """
+    COPY INTO HELIUS_SWAPS_LOAD
+    FROM @%HELIUS_SWAPS/webhook/
+    FILES = ('{file_name}')
+    FILE_FORMAT = (TYPE = JSON)
+    MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+    ON_ERROR = CONTINUE
+    PURGE = TRUE
+"""
+_INSERT_FROM_LOAD_SQL = f"""
+    INSERT INTO HELIUS_SWAPS ({_SWAP_COLUMNS})
+    SELECT {_SWAP_COLUMNS}
+    FROM HELIUS_SWAPS_LOAD src
+    WHERE NOT EXISTS (SELECT 1 FROM HELIUS_SWAPS t WHERE t.SIGNATURE = src.SIGNATURE)
+"""
+
+# Minimum number of seconds between two DAG triggers
+DAG_TRIGGER_INTERVAL_SECONDS = 60
+
+# time.monotonic() reading of the most recent DAG trigger known to this container:
+# one it fired itself, or another container's trigger reported by DynamoDB.
+# Monotonic, so the in-process window is unaffected by wall clock adjustments.
 last_trigger_time = None
 
-def get_snowflake_connection_string(account, user, password, warehouse, database, schema, role):
+# snowflake.connector module, imported on first connect: it is the heaviest
+# import in the package and not every invocation reaches Snowflake
+_sf = None
+
+# Snowflake connection shared by warm invocations of this container
+_CONN = None
+_CONN_LOCK = threading.Lock()
+_conn_last_used = 0.0
+
+# Worker threads for overlapping Snowflake, Airflow and connection setup I/O,
+# kept for the lifetime of the container
+_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+# A cached connection idle for longer than this is probed with SELECT 1 before reuse
+CONNECTION_PROBE_AFTER_SECONDS = 300
+
+# Shared botocore settings: TCP keep-alive so warm invocations reuse sockets,
+# a pool sized for the worker threads, and standard-mode retries
+_BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=10,
+    retries={'mode': 'standard', 'max_attempts': 3}
+)
+
+# SQS client for queueing webhooks, created on first use
+_SQS = None
+
+# DynamoDB client for the shared DAG trigger latch, created on first use
+_DYNAMODB = None
+
+# HTTP session so the Airflow connection is kept alive across calls and invocations.
+# Created on first use so payloads that never trigger Airflow skip importing requests.
+_HTTP = None
+
+# Batches at least this large are bulk-loaded with PUT + COPY INTO instead of INSERT
+COPY_THRESHOLD = int(os.environ.get('SNOWFLAKE_COPY_THRESHOLD', '500'))
+
+# Static pieces of API Gateway responses, built once per container
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_INVALID_JSON_BODY = '{"message":"Invalid JSON in request body"}'
+_QUEUED_BODY = '{"message":"Webhook received and queued"}'
+_TOO_LARGE_BODY = '{"message":"Webhook transaction exceeds the queue message size limit"}'
+_PROCESSED_BODY_TEMPLATE = '{{"message":"Webhook received and processed successfully","records_processed":{count}}}'
+
+# Column order of a processed swap record
+_RECORD_KEYS = (
+    "user_address", "swapfromtoken", "swapfromamount",
+    "swaptotoken", "swaptoamount", "signature",
+    "source", "timestamp",
+)
+# Builds an INSERT parameter tuple in _SWAP_COLUMNS order in one C-level call
+_INSERT_KEYS = operator.itemgetter(*_RECORD_KEYS)
+
+# C-level field extractors used by iter_transaction_records
+_get_from_fields = operator.itemgetter("fromUserAccount", "mint", "tokenAmount")
+_get_to_fields = operator.itemgetter("mint", "tokenAmount")
+_get_tx_fields = operator.itemgetter("signature", "source")
+
+def _connection_is_alive(connection):
+    """
+    Lightweight health probe for a cached Snowflake connection
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return True
+    except Exception as e:
+        logger.warning(f"Cached Snowflake connection failed health check: {str(e)}")
+        return False
+
+def _get_connection():
+    """
+    Return the module-level Snowflake connection, opening it on first use and
+    reopening it if it was closed or went stale while the container was frozen
+    """
+    global _sf, _CONN, _conn_last_used
+    # Serialized because the connection may be warmed up from a worker thread
+    with _CONN_LOCK:
+        now = time.monotonic()
+        if _CONN is not None:
+            idle_too_long = now - _conn_last_used > CONNECTION_PROBE_AFTER_SECONDS
+            if _CONN.is_closed() or (idle_too_long and not _connection_is_alive(_CONN)):
+                logger.info("Reconnecting to Snowflake")
+                try:
+                    _CONN.close()
+                except Exception:
+                    pass
+                _CONN = None
+        
+        if _CONN is None:
+            if _sf is None:
+                import snowflake.connector as _sf
+            _CONN = _sf.connect(**_SNOWFLAKE_CONNECT_ARGS)
+        
+        _conn_last_used = now
+        return _CONN
+
+def _get_http():
     """
-    Construct Snowflake connection string
+    Return the module-level requests session, creating it on first use
     """
-    return (
-        f"snowflake://{quote_plus(user)}:{quote_plus(password)}@"
-        f"{quote_plus(account)}/{database}/{schema}?warehouse={warehouse}&role={role}"
-    )
+    global _HTTP
+    if _HTTP is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _HTTP = requests.Session()
+        # Small keep-alive pool dedicated to the Airflow endpoint
+        _HTTP.mount(AIRFLOW_ENDPOINT, HTTPAdapter(pool_connections=2, pool_maxsize=4))
+    return _HTTP
 
-def insert_to_snowflake(records, account, user, password, warehouse, database, schema, role):
+def _get_sqs():
+    """
+    Return the module-level SQS client, creating it on first use
     """
-    Insert processed records into Snowflake using SQLAlchemy
+    global _SQS
+    if _SQS is None:
+        _SQS = boto3.client('sqs', config=_BOTO_CONFIG)
+    return _SQS
+
+def _get_dynamodb():
+    """
+    Return the module-level DynamoDB client, creating it on first use
+    """
+    global _DYNAMODB
+    if _DYNAMODB is None:
+        _DYNAMODB = boto3.client('dynamodb', config=_BOTO_CONFIG)
+    return _DYNAMODB
+
+def _prime_connection():
+    """
+    Open the Snowflake connection during init so provisioned environments
+    start with a live Snowflake session
+    """
+    try:
+        _get_connection()
+        logger.info("Snowflake connection primed during initialization")
+    except Exception as e:
+        logger.warning(f"Could not prime Snowflake connection: {str(e)}")
+
+def _copy_into_snowflake(cursor, records):
+    """
+    Bulk-load records through the HELIUS_SWAPS table stage with PUT + COPY INTO a
+    temporary table, then insert the ones whose signature is not stored yet.
+    Rows Snowflake rejects are skipped and logged; returns (rows loaded, rows inserted).
+    """
+    # Only large batches take this path, so its modules are imported on demand
+    import gzip
+    import tempfile
+    
+    # Sortable by load time; the UUID suffix keeps concurrent containers apart
+    file_name = f"helius_swaps_{time.time_ns()}_{uuid.uuid4().hex[:8]}.json.gz"
+    local_path = os.path.join(tempfile.gettempdir(), file_name)
+    try:
+        # Newline-delimited JSON, gzipped in memory so PUT uploads it as-is;
+        # keys match the table columns case-insensitively. Level 1 keeps most
+        # of the size reduction on this repetitive JSON at a fraction of the CPU.
+        ndjson = b"".join(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in records)
+        with open(local_path, 'wb') as f:
+            f.write(gzip.compress(ndjson, compresslevel=1))
+        
+        cursor.execute(_CREATE_LOAD_TABLE_SQL)
+        cursor.execute(_PUT_SQL.format(local_path=local_path))
+        cursor.execute(_COPY_SQL.format(file_name=file_name))
+        # One result row per file: file, status, rows_parsed, rows_loaded, error_limit,
+        # errors_seen, first_error, ...
+        result = cursor.fetchone()
+    finally:
+        os.remove(local_path)
+    
+    if not result or len(result) < 7:
+        logger.warning(f"COPY INTO loaded no files from {file_name}")
+        return 0, 0
+    
+    rows_loaded, errors_seen, first_error = result[3], result[5], result[6]
+    if errors_seen:
+        logger.error(f"COPY INTO rejected {errors_seen} rows from {file_name}; first error: {first_error}")
+    
+    cursor.execute(_INSERT_FROM_LOAD_SQL)
+    return rows_loaded, cursor.rowcount
+
+def _drop_repeated_signatures(records):
+    """
+    Remove records whose signature is repeated within the batch; signatures already
+    stored in HELIUS_SWAPS are filtered out by the insert statements themselves
+    """
+    unique_records = []
+    seen = set()
+    for record in records:
+        signature = record["signature"]
+        if signature is not None:
+            if signature in seen:
+                continue
+            seen.add(signature)
+        unique_records.append(record)
+    return unique_records
+
+def insert_to_snowflake(records):
+    """
+    Insert processed records into Snowflake using snowflake.connector
     """
     if not records:
         logger.info("No records to insert into Snowflake")
         return
     
     try:
-        # Create SQLAlchemy engine
-        connection_string = get_snowflake_connection_string(
-            account, user, password, warehouse, database, schema, role
-        )
+        unique_records = _drop_repeated_signatures(records)
         
-        engine = create_engine(
-            connection_string, 
-            pool_size=5,  
-            max_overflow=0  
-        )
+        connection = _get_connection()
+        with connection.cursor() as cursor:
+            if len(unique_records) >= COPY_THRESHOLD:
+                # Large batches go through Snowflake's bulk loader
+                candidate_count, inserted_count = _copy_into_snowflake(cursor, unique_records)
+            else:
+                # One autocommitted statement per MAX_VALUES_ROWS rows (a single one unless
+                # COPY_THRESHOLD is raised past it), duplicates dropped server-side
+                candidate_count = len(unique_records)
+                inserted_count = 0
+                for start in range(0, candidate_count, MAX_VALUES_ROWS):
+                    chunk = unique_records[start:start + MAX_VALUES_ROWS]
+                    rows = ", ".join([_VALUES_ROW] * len(chunk))
+                    params = [value for r in chunk for value in _INSERT_KEYS(r)]
+                    cursor.execute(_INSERT_SQL.format(rows=rows), params)
+                    inserted_count += cursor.rowcount
         
-        # Use a single connection for multiple inserts
-        with engine.connect() as connection:
-            # Prepare the insert statement
-            insert_query = text("""
-                INSERT INTO HELIUS_SWAPS (
-                    USER_ADDRESS, SWAPFROMTOKEN, SWAPFROMAMOUNT, 
-                    SWAPTOTOKEN, SWAPTOAMOUNT, SIGNATURE, 
-                    SOURCE, TIMESTAMP
-                ) VALUES (
-                    :user_address, :swapfromtoken, :swapfromamount,
-                    :swaptotoken, :swaptoamount, :signature,
-                    :source, :timestamp
-                )
-            """)
-            
-            # Execute batch insert
-            inserted_count = 0
-            duplicate_count = 0
-            
-            for record in records:
-                try:
-                    connection.execute(insert_query, record)
-                    inserted_count += 1
-                except Exception as e:
-                    error_msg = str(e)
-                    if "DUPLICATE" in error_msg or "UNIQUE" in error_msg or "PRIMARY KEY" in error_msg:
-                        logger.warning(f"Record with signature {record.get('signature')} already exists")
-                        duplicate_count += 1
-                    else:
-                        logger.error(f"Error inserting record: {error_msg}")
-                        raise
-            
-            # Commit the transaction
-            connection.commit()
-            
-            logger.info(f"Snowflake insertion summary: {inserted_count} inserted, {duplicate_count} duplicates")
+        duplicate_count = len(records) - len(unique_records) + candidate_count - inserted_count
+        logger.info(f"Snowflake insertion summary: {inserted_count} inserted, {duplicate_count} duplicates")
     
     except Exception as e:
         logger.error(f"Error inserting into Snowflake: {str(e)}")
@@ -91,33 +332,36 @@ def insert_to_snowflake(records, account, user, password, warehouse, database, s
 def lambda_handler(event, context):
     """
     Lambda handler for webhook events:
-    1. Processes the webhook data
-    2. Stores the processed data in Snowflake
-    3. Triggers Airflow DAG
+    - API Gateway requests are queued to SQS when WEBHOOK_QUEUE_URL is set
+    - SQS batches are processed together, with one Snowflake load and one DAG trigger
+    - Direct invocations, or requests when no queue is configured, are processed inline
     """
+    # Errors in an SQS batch must propagate so Lambda retries the batch instead of deleting it
+    if isinstance(event, dict) and 'Records' in event:
+        return process_queued_webhooks(event['Records'])
+    
     try:
-        # Get environment variables
-        snowflake_account = os.environ.get('SNOWFLAKE_ACCOUNT')
-        snowflake_user = os.environ.get('SNOWFLAKE_USER')
-        snowflake_password = os.environ.get('SNOWFLAKE_PASSWORD')
-        snowflake_warehouse = os.environ.get('SNOWFLAKE_WAREHOUSE', 'DEV_WH')
-        snowflake_database = os.environ.get('SNOWFLAKE_DATABASE', 'DEV')
-        snowflake_schema = os.environ.get('SNOWFLAKE_SCHEMA', 'BRONZE')
-        snowflake_role = os.environ.get('SNOWFLAKE_ROLE', 'AIRFLOW_ROLE')
-        airflow_endpoint = os.environ.get('AIRFLOW_ENDPOINT', 'http://52.205.187.101:8080')
-        airflow_username = os.environ.get('AIRFLOW_USERNAME', 'admin')
-        airflow_password = os.environ.get('AIRFLOW_PASSWORD', 'password')
-        
         # Extract body from API Gateway event
         if 'body' in event:
             # From API Gateway
             try:
-                if isinstance(event['body'], str):
-                    payload = json.loads(event['body'])
-                else:
-                    payload = event['body']
-            except json.JSONDecodeError:
-                return respond(400, {'message': 'Invalid JSON in request body'})
+                raw_body = _read_raw_body(event)
+                payload = event['body'] if raw_body is None else orjson.loads(raw_body)
+            except ValueError:
+                # Covers orjson.JSONDecodeError (including empty bodies) and malformed base64
+                return respond_json(400, _INVALID_JSON_BODY)
+            
+            # Webhooks carry a transaction object or a list of them; reject anything else
+            # before it is acknowledged
+            if not isinstance(payload, (dict, list)):
+                return respond_json(400, _INVALID_JSON_BODY)
+            
+            if WEBHOOK_QUEUE_URL:
+                if not enqueue_webhook(raw_body, payload):
+                    # Retrying cannot help: the same transaction would never fit
+                    return respond_json(413, _TOO_LARGE_BODY)
+                # Accepted: ingest happens asynchronously in the SQS consumer
+                return respond_json(202, _QUEUED_BODY)
         else:
             # Direct invocation
             payload = event
@@ -128,98 +372,298 @@ def lambda_handler(event, context):
             # Preprocess the data
             processed_records = process_transaction_data(payload)
             
-            if processed_records:
-                # Insert data into Snowflake
-                insert_to_snowflake(processed_records, snowflake_account, snowflake_user, 
-                                    snowflake_password, snowflake_warehouse, snowflake_database,
-                                    snowflake_schema, snowflake_role)
-                
-                # Trigger Airflow DAG
-                maybe_trigger_dag(airflow_endpoint, airflow_username, airflow_password)
-            else:
-                logger.info("No valid records to process")
+            store_records(processed_records)
             
         except Exception as e:
             logger.error(f"Error processing data: {str(e)}")
+            import traceback
             traceback.print_exc()
             return respond(500, {'message': f'Error processing data: {str(e)}'})
         
-        return respond(200, {
-            'message': 'Webhook received and processed successfully',
-            'records_processed': len(processed_records)
-        })
+        return respond_json(200, _PROCESSED_BODY_TEMPLATE.format(count=len(processed_records)))
         
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}")
+        import traceback
         traceback.print_exc()
         return respond(500, {'message': f'Error processing webhook: {str(e)}'})
 
-def process_transaction_data(payload):
+def _read_raw_body(event):
     """
-    Process transaction data from webhook payload
+    Return an API Gateway body as JSON bytes, or None when the body arrived already parsed
+    """
+    body = event['body']
+    if event.get('isBase64Encoded'):
+        return base64.b64decode(body)
+    if isinstance(body, str):
+        return body.encode()
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body)
+    # Direct invocations may pass the body as a dict or list
+    return None
+
+def store_records(processed_records):
+    """
+    Insert processed records into Snowflake and trigger the Airflow DAG
     """
-    transformed = []
+    if not processed_records:
+        logger.info("No valid records to process")
+        return
+    
+    # The two calls are independent network waits, so run them side by side.
+    # Both are awaited: Lambda freezes the container once the handler returns,
+    # so work left running in the background may never complete.
+    # Insert data into Snowflake
+    snowflake_future = _EXECUTOR.submit(insert_to_snowflake, processed_records)
+    
+    # Trigger Airflow DAG
+    airflow_future = _EXECUTOR.submit(maybe_trigger_dag, AIRFLOW_ENDPOINT, AIRFLOW_USERNAME, AIRFLOW_PASSWORD)
+    
+    # Wait for both before reading either result, so a Snowflake error cannot return
+    # while the DAG trigger is still mid-claim or mid-POST
+    concurrent.futures.wait([snowflake_future, airflow_future])
+    snowflake_future.result()
+    airflow_future.result()
+
+def process_queued_webhooks(messages):
+    """
+    Process a batch of queued webhook bodies with a single Snowflake load and DAG trigger
+    """
+    # One streaming pass over every queued transaction. Malformed transactions are
+    # counted and skipped, so they cannot fail the whole batch.
+    skipped = {'missing_transfers': 0, 'malformed': 0}
+    processed_records = []
+    warm_up = None
+    for record in iter_transaction_records(_iter_queued_transactions(messages), skipped):
+        if warm_up is None:
+            # Once there is something to load, open (or health-check) the Snowflake
+            # connection while the rest of the batch is transformed
+            warm_up = _EXECUTOR.submit(_get_connection)
+        processed_records.append(record)
+    
+    if warm_up is not None:
+        # Never leave the connect running when the handler returns: Lambda would freeze
+        # it mid-login while it holds _CONN_LOCK. Connect errors are not raised here;
+        # insert_to_snowflake retries the connect and reports them.
+        concurrent.futures.wait([warm_up])
+    
+    # Logged once per batch rather than once per message or transaction
+    if skipped['missing_transfers']:
+        logger.warning(f"Skipped {skipped['missing_transfers']} transactions without tokenTransfers")
+    if skipped['malformed']:
+        logger.error(f"Skipped {skipped['malformed']} malformed transactions")
     
-    # Check if payload is a list or needs to be wrapped in a list
+    logger.info(f"Processing {len(processed_records)} records from {len(messages)} queued webhooks")
+    store_records(processed_records)
+    
+    return {'records_processed': len(processed_records)}
+
+def _iter_queued_transactions(messages):
+    """
+    Yield the transactions of every decodable queued webhook body
+    """
+    for message in messages:
+        try:
+            payload = orjson.loads(message['body'])
+        except orjson.JSONDecodeError:
+            logger.error(f"Skipping queued message {message.get('messageId')}: invalid JSON")
+            continue
+        if isinstance(payload, list):
+            yield from payload
+        else:
+            # Anything that is not a transaction object is rejected per transaction downstream
+            yield payload
+
+def _split_payload(payload):
+    """
+    Split a webhook payload into JSON array bodies that each fit in one SQS message
+    """
     transactions = payload if isinstance(payload, list) else [payload]
+    chunk, chunk_size = [], 2  # Account for the enclosing brackets
+    for tx in transactions:
+        encoded = orjson.dumps(tx)
+        if chunk and chunk_size + len(encoded) + 1 > SQS_MAX_MESSAGE_BYTES:
+            yield b"[" + b",".join(chunk) + b"]"
+            chunk, chunk_size = [], 2
+        chunk.append(encoded)
+        chunk_size += len(encoded) + 1
+    if chunk:
+        yield b"[" + b",".join(chunk) + b"]"
+
+def enqueue_webhook(raw_body, payload):
+    """
+    Forward a validated webhook body to the ingest queue, splitting bodies above the
+    SQS size limit. The body is forwarded as received; it is only re-serialized when
+    it arrived already parsed.
+    Returns False, without sending anything, when a single transaction is too large
+    for one SQS message.
+    """
+    if raw_body is None:
+        raw_body = orjson.dumps(payload)
+    
+    if len(raw_body) <= SQS_MAX_MESSAGE_BYTES:
+        message_bodies = [raw_body]
+    else:
+        message_bodies = list(_split_payload(payload))
+        # Splitting happens between transactions, so one oversize transaction stays oversize
+        oversize = max(len(message_body) for message_body in message_bodies)
+        if oversize > SQS_MAX_MESSAGE_BYTES:
+            logger.error(f"Rejecting webhook body of {len(raw_body)} bytes: a transaction needs {oversize} bytes, "
+                         f"above the {SQS_MAX_MESSAGE_BYTES} byte SQS limit")
+            return False
+        logger.info(f"Webhook body of {len(raw_body)} bytes split into {len(message_bodies)} queue messages")
+    
+    sqs = _get_sqs()
+    for message_body in message_bodies:
+        sqs.send_message(QueueUrl=WEBHOOK_QUEUE_URL, MessageBody=message_body.decode())
+    return True
+
+def _record_values(first_tt, last_tt, tx):
+    """
+    Extract the swap fields of a transaction, in _RECORD_KEYS order (without the timestamp)
+    """
+    try:
+        return _get_from_fields(first_tt) + _get_to_fields(last_tt) + _get_tx_fields(tx)
+    except KeyError:
+        # Fall back to tolerant lookups when Helius omits a field
+        return (
+            first_tt.get("fromUserAccount"), first_tt.get("mint"), first_tt.get("tokenAmount"),
+            last_tt.get("mint"), last_tt.get("tokenAmount"),
+            tx.get("signature"), tx.get("source"),
+        )
+
+def iter_transaction_records(payload, skipped=None):
+    """
+    Yield processed records from a webhook payload: a single transaction,
+    a list of transactions, or any iterable of transactions.
+    
+    Without `skipped`, a malformed transaction raises and transactions without
+    tokenTransfers are logged here. With a `skipped` dict, malformed transactions are
+    skipped instead, and both kinds are counted into it for the caller to log once.
+    """
+    # A single transaction is wrapped without building a list
+    transactions = (payload,) if isinstance(payload, dict) else payload
+    
+    # Logged once after the loop instead of a warning per transaction
+    missing_transfers = 0
+    malformed = 0
     
     for tx in transactions:
-        # Handle case where this might be a nested list
-        if isinstance(tx, list) and len(tx) > 0:
-            tx = tx[0]
-        
-        # Get tokenTransfers if available
-        token_transfers = tx.get("tokenTransfers", [])
-        if not token_transfers:
-            logger.warning(f"No tokenTransfers found in transaction: {tx.get('signature', 'unknown')}")
-            continue
+        try:
+            # Handle case where this might be a nested list
+            if isinstance(tx, list) and len(tx) > 0:
+                tx = tx[0]
             
-        # Extract first and last token transfer
-        first_tt = token_transfers[0]
-        last_tt = token_transfers[-1]
-        
-        # Convert timestamp
-        ts = tx.get("timestamp")
-        ts_str = None
-        if ts:
-            try:
-                # Handle timestamp as seconds since epoch
-                if isinstance(ts, (int, float)):
-                    ts_str = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
-                # Handle timestamp as string
-                elif isinstance(ts, str):
-                    ts_str = ts
-            except Exception as e:
-                logger.warning(f"Error parsing timestamp: {e}")
-        
-        # Create transformed record
-        transformed_record = {
-            "user_address": first_tt.get("fromUserAccount"),
-            "swapfromtoken": first_tt.get("mint"),
-            "swapfromamount": first_tt.get("tokenAmount"),
-            "swaptotoken": last_tt.get("mint"),
-            "swaptoamount": last_tt.get("tokenAmount"),
-            "signature": tx.get("signature"),
-            "source": tx.get("source"),
-            "timestamp": ts_str,
-        }
-        
-        # Filter out PUMP_FUN source as in your DAG logic
-        if transformed_record.get("source") != "PUMP_FUN":
-            transformed.append(transformed_record)
+            # Filter out PUMP_FUN source as in your DAG logic, before any other per-record work
+            if tx.get("source") == "PUMP_FUN":
+                continue
+            
+            # Get tokenTransfers if available
+            token_transfers = tx.get("tokenTransfers")
+            if not token_transfers:
+                missing_transfers += 1
+                continue
+                
+            # Extract first and last token transfer
+            first_tt = token_transfers[0]
+            last_tt = token_transfers[-1]
+            
+            # Convert timestamp
+            ts = tx.get("timestamp")
+            ts_str = None
+            if ts:
+                try:
+                    # Handle timestamp as seconds since epoch
+                    if isinstance(ts, (int, float)):
+                        tm = time.gmtime(ts)
+                        ts_str = (
+                            f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d} "
+                            f"{tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d}"
+                        )
+                    # Handle timestamp as string
+                    elif isinstance(ts, str):
+                        ts_str = ts
+                except Exception as e:
+                    logger.warning(f"Error parsing timestamp: {e}")
+            
+            # Create transformed record
+            record = dict(zip(_RECORD_KEYS, _record_values(first_tt, last_tt, tx) + (ts_str,)))
+        except Exception as e:
+            if skipped is None:
+                raise
+            if not malformed:
+                # One example per batch is enough to diagnose a bad sender
+                logger.error(f"Skipping malformed transaction: {e!r}")
+            malformed += 1
+            continue
+        yield record
     
-    return transformed
+    if skipped is not None:
+        skipped['missing_transfers'] += missing_transfers
+        skipped['malformed'] += malformed
+    elif missing_transfers:
+        logger.warning(f"Skipped {missing_transfers} transactions without tokenTransfers")
+
+def process_transaction_data(payload):
+    """
+    Process transaction data from webhook payload
+    """
+    return list(iter_transaction_records(payload))
+
+def _claim_dag_trigger(now):
+    """
+    Claim the shared DAG trigger slot with a conditional write.
+    Returns (claimed, last_trigger), where last_trigger is the epoch of the
+    trigger that currently holds the slot.
+    """
+    try:
+        _get_dynamodb().update_item(
+            TableName=DAG_TRIGGER_LOCK_TABLE,
+            Key={'lock_id': {'S': 'token_activity_notification_dag'}},
+            UpdateExpression='SET last_trigger = :now',
+            ConditionExpression='attribute_not_exists(last_trigger) OR last_trigger < :cutoff',
+            ExpressionAttributeValues={
+                ':now': {'N': str(int(now))},
+                ':cutoff': {'N': str(int(now) - DAG_TRIGGER_INTERVAL_SECONDS)}
+            },
+            # Return the holder's timestamp so this container can skip DynamoDB until it expires
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            held_since = e.response.get('Item', {}).get('last_trigger', {}).get('N')
+            return False, float(held_since) if held_since else now
+        raise
+    return True, now
 
 def maybe_trigger_dag(airflow_endpoint, airflow_username, airflow_password, conf={}):
     """
     Triggers the DAG only if at least one minute has passed since the last trigger.
+    The interval is shared by all concurrent containers through DynamoDB when
+    DAG_TRIGGER_LOCK_TABLE is set, and tracked per container otherwise.
     """
     global last_trigger_time
-    now = datetime.datetime.utcnow()
-    if last_trigger_time is not None and (now - last_trigger_time) < datetime.timedelta(minutes=1):
+    now = time.monotonic()
+    
+    # In-process check first: inside a known window there is no need to ask DynamoDB
+    if last_trigger_time is not None and now - last_trigger_time < DAG_TRIGGER_INTERVAL_SECONDS:
         logger.info("DAG trigger skipped: triggered less than a minute ago.")
         return
     
+    if DAG_TRIGGER_LOCK_TABLE:
+        # The shared slot is kept in epoch seconds, comparable across containers
+        wall_now = time.time()
+        try:
+            claimed, last_trigger = _claim_dag_trigger(wall_now)
+        except Exception as e:
+            logger.error("Exception while claiming DAG trigger slot: %s", e)
+            return
+        if not claimed:
+            # Map the holder's epoch timestamp onto this container's monotonic clock
+            last_trigger_time = now - (wall_now - last_trigger)
+            logger.info("DAG trigger skipped: triggered less than a minute ago.")
+            return
+    
     last_trigger_time = now
     trigger_airflow_dag(airflow_endpoint, airflow_username, airflow_password, conf)
 
@@ -234,7 +678,7 @@ def trigger_airflow_dag(airflow_endpoint, airflow_username, airflow_password, co
     }
     
     # Generate a unique dag_run_id with the current UTC time.
-    time_str = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    time_str = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
     dag_run_id = f"webhooktrigger{time_str}"
     
     data = {
@@ -243,12 +687,13 @@ def trigger_airflow_dag(airflow_endpoint, airflow_username, airflow_password, co
     }
     
     try:
-        response = requests.post(
+        from requests.auth import HTTPBasicAuth
+        response = _get_http().post(
             dag_run_endpoint,
             json=data,
             headers=headers,
             auth=HTTPBasicAuth(airflow_username, airflow_password),
-            timeout=10  # Add timeout to prevent hanging
+            timeout=(2, 8)  # (connect, read) timeouts to prevent hanging
         )
         
         if response.status_code in [200, 201]:
@@ -263,10 +708,18 @@ def respond(status_code, body):
     """
     Create API Gateway response
     """
+    return respond_json(status_code, orjson.dumps(body).decode())
+
+def respond_json(status_code, body_json):
+    """
+    Create API Gateway response from an already serialized JSON body
+    """
     return {
         'statusCode': status_code,
-        'body': json.dumps(body),
-        'headers': {
-            'Content-Type': 'application/json',
-        }
-    }
\ No newline at end of file
+        'body': body_json,
+        'headers': _JSON_HEADERS
+    }
+
+# Provisioned environments are initialized ahead of traffic, so pay the connect cost there
+if os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') == 'provisioned-concurrency':
+    _prime_connection()
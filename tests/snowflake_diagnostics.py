@@ -10,6 +10,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Shared engine, created on first use so its connection pool is reused across calls
+_ENGINE = None
+
 def get_snowflake_connection_string():
     """
     Construct Snowflake connection string from environment variables
@@ -40,6 +43,20 @@ def get_snowflake_connection_string():
     
     return connection_string
 
+def get_engine():
+    """
+    Return the module-level SQLAlchemy engine, creating it on first use
+    """
+    global _ENGINE
+    if _ENGINE is None:
+        _ENGINE = create_engine(
+            get_snowflake_connection_string(),
+            pool_size=5,  # Minimal connection pool
+            max_overflow=0,  # Prevent creating additional connections
+            pool_pre_ping=True  # Replace connections that went stale while pooled
+        )
+    return _ENGINE
+
 def test_snowflake_connection():
     """
     Test Snowflake connection using SQLAlchemy
@@ -54,16 +71,8 @@ def test_snowflake_connection():
         logger.info(f"Schema: {os.getenv('SNOWFLAKE_SCHEMA', 'BRONZE')}")
         logger.info(f"Role: {os.getenv('SNOWFLAKE_ROLE', 'AIRFLOW_ROLE')}")
 
-        # Create engine with minimal connection pooling
-        connection_string = get_snowflake_connection_string()
-        engine = create_engine(
-            connection_string, 
-            pool_size=5,  # Minimal connection pool
-            max_overflow=0  # Prevent creating additional connections
-        )
-        
         # Attempt to connect and execute a simple query
-        with engine.connect() as connection:
+        with get_engine().connect() as connection:
             # Test basic connectivity
             result = connection.execute(text("SELECT CURRENT_WAREHOUSE()"))
             warehouse = result.scalar()
@@ -94,16 +103,8 @@ def insert_records(records):
         return
     
     try:
-        # Create engine with minimal connection pooling
-        connection_string = get_snowflake_connection_string()
-        engine = create_engine(
-            connection_string, 
-            pool_size=5,  
-            max_overflow=0  
-        )
-        
         # Use a single connection for multiple inserts
-        with engine.connect() as connection:
+        with get_engine().connect() as connection:
             # Prepare the insert statement
             insert_query = text("""
                 INSERT INTO HELIUS_SWAPS (
@@ -117,9 +118,8 @@ def insert_records(records):
                 )
             """)
             
-            # Execute batch insert
-            for record in records:
-                connection.execute(insert_query, record)
+            # Execute batch insert; a list of parameter dicts runs as one executemany call
+            connection.execute(insert_query, records)
             
             # Commit transaction
             connection.commit()
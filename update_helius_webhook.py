@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 import os
-import subprocess
 import json
 import logging
+import boto3
 import requests
+from botocore.exceptions import BotoCoreError, ClientError
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -17,6 +18,9 @@ logger = logging.getLogger(__name__)
 # import HELIUS_API_KEY from .env
 HELIUS_API_KEY = os.getenv("HELIUS_API_KEY")
 
+# Shared session so consecutive Helius API calls reuse one TLS connection
+session = requests.Session()
+
 def get_latest_stack_name():
     """Get the latest stack name from the .stack_info file."""
     try:
@@ -38,14 +42,14 @@ def get_webhook_url_from_aws():
     logger.info(f"Using stack name: {stack_name}")
     
     try:
-        cmd = [
-            "aws", "cloudformation", "describe-stacks",
-            "--stack-name", stack_name,
-            "--query", "Stacks[0].Outputs[?OutputKey=='ApiUrl'].OutputValue",
-            "--output", "text"
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        webhook_url = result.stdout.strip()
+        # Query CloudFormation in-process instead of spawning the AWS CLI
+        cloudformation = boto3.client("cloudformation")
+        stacks = cloudformation.describe_stacks(StackName=stack_name)["Stacks"]
+        outputs = stacks[0].get("Outputs", []) if stacks else []
+        webhook_url = next(
+            (o["OutputValue"] for o in outputs if o["OutputKey"] == "ApiUrl"),
+            None
+        )
         
         if webhook_url:
             logger.info(f"Got webhook URL from AWS: {webhook_url}")
@@ -53,7 +57,7 @@ def get_webhook_url_from_aws():
         else:
             logger.error("Webhook URL not found in CloudFormation outputs")
             return None
-    except Exception as e:
+    except (BotoCoreError, ClientError) as e:
         logger.error(f"Error getting webhook URL from AWS: {e}")
         return None
 
@@ -61,7 +65,7 @@ def get_existing_webhooks(api_key):
     """Retrieves all existing webhooks using the Helius API."""
     url = f"https://api.helius.xyz/v0/webhooks?api-key={api_key}"
     try:
-        response = requests.get(url)
+        response = session.get(url)
         if response.status_code == 200:
             webhooks = response.json()
             logger.info(f"Retrieved {len(webhooks)} existing webhooks")
@@ -88,7 +92,7 @@ def update_webhook(webhook_id, new_url, original_data, api_key):
     
     headers = {"Content-Type": "application/json"}
     try:
-        response = requests.put(url, headers=headers, data=json.dumps(payload))
+        response = session.put(url, headers=headers, data=json.dumps(payload))
         if response.status_code == 200:
             logger.info(f"Successfully updated webhook with new URL: {new_url}")
             return response.json()